@@ -4,43 +4,20 @@
 #
 
 import argparse
-import random
-import re
-import string
-from typing import Dict, Iterator, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import torch
 from torch import Tensor
+from torch.nn import functional as F
+from torch.nn.utils.rnn import pad_sequence
 
 from corenet.data.datasets.dataset_base import BaseIterableDataset
+from corenet.data.datasets.language_modeling.text_processing import (
+    cleaned_length_at_least,
+)
 from corenet.data.text_tokenizer import build_tokenizer
-
-
-def _process_text(text: str) -> str:
-    """Process text to identify low-length content.
-
-    This processing step follows SlimPajama.
-
-    Citation:
-        @misc{cerebras2023slimpajama,
-            author = {Soboleva, Daria and Al-Khateeb, Faisal and Myers, Robert and Steeves, Jacob R and Hestness, Joel and Dey, Nolan},
-            title = {{SlimPajama: A 627B token cleaned and deduplicated version of RedPajama}},
-            month = June,
-            year = 2023,
-            url = {https://huggingface.co/datasets/cerebras/SlimPajama-627B},
-            howpublished = {https://www.cerebras.net/blog/slimpajama-a-627b-token-cleaned-and-deduplicated-version-of-redpajama},
-        }
-
-    Args:
-        text: Input text sequence.
-
-    Returns:
-        Processed text sequence.
-    """
-    text = text.lower()
-    text = text.translate(str.maketrans("", "", string.punctuation))
-    text = re.sub(r"\s+", " ", text.strip())
-    return text
+from corenet.utils import logger
 
 
 class BaseLMIterableDataset(BaseIterableDataset):
@@ -53,7 +30,9 @@ class BaseLMIterableDataset(BaseIterableDataset):
     def __init__(self, opts: argparse.Namespace, *args, **kwargs) -> None:
         super().__init__(opts, *args, **kwargs)
         self.shuffle_data = getattr(opts, "dataset.language_modeling.shuffle_data")
-        self._rng = random.Random(self.seed)
+        # PCG64 generates vectorized draws (e.g., permutations) in a single call, and its streams are
+        # reproducible across platforms and Python versions.
+        self._rng = np.random.Generator(np.random.PCG64(self.seed))
 
         self.sequence_length = getattr(
             opts, "dataset.language_modeling.sequence_length"
@@ -64,18 +43,56 @@ class BaseLMIterableDataset(BaseIterableDataset):
         self.min_characters_per_text = getattr(
             opts, "dataset.language_modeling.min_characters_per_text"
         )
+        self.tokenizer_batch_size = getattr(
+            opts, "dataset.language_modeling.tokenizer_batch_size"
+        )
+        if self.tokenizer_batch_size <= 0:
+            logger.error(
+                f"Tokenizer batch size should be a positive integer. Got: {self.tokenizer_batch_size}."
+            )
+        self.pack_sequences = getattr(opts, "dataset.language_modeling.pack_sequences")
+        self.sliding_window_stride = getattr(
+            opts, "dataset.language_modeling.sliding_window_stride"
+        )
+        if self.sliding_window_stride is not None:
+            if self.sliding_window_stride <= 0:
+                logger.error(
+                    f"Sliding window stride should be a positive integer. Got: {self.sliding_window_stride}."
+                )
+            if self.pack_sequences:
+                logger.error(
+                    "Sliding windows and sequence packing can't be enabled together, "
+                    "because packed sequences already use all the tokens."
+                )
 
         self.tokenizer = build_tokenizer(opts)
+        # Querying the tokenizer may be expensive (e.g., for tokenizers backed by native libraries),
+        # so the padding index and vocabulary size are read once.
+        self._pad_token_id = int(self.tokenizer.pad_token_id)
+        self._vocab_size = int(self.tokenizer.vocab_size)
+
+        # Token indices are stored as 32-bit integers when the vocabulary allows it. This halves the
+        # memory traffic between data workers and devices compared to 64-bit integers.
+        max_token_id = max(self.vocab_size, self.pad_token_id)
+        self._token_dtype = (
+            torch.int32 if max_token_id <= torch.iinfo(torch.int32).max else torch.int64
+        )
+
+        if self.pack_sequences:
+            # Packed text sequences are separated with the end of text token.
+            self._eot_token_id = self.tokenizer.eot_token_id
+            # Tokens that did not fit in the last packed sequence. See '_pack_tokenized_texts'.
+            self._packing_carry = torch.empty(size=(0,), dtype=self._token_dtype)
 
     @property
     def pad_token_id(self) -> int:
         """Index corresponding to padding token."""
-        return self.tokenizer.pad_token_id
+        return self._pad_token_id
 
     @property
     def vocab_size(self) -> int:
         """Vocabulary size."""
-        return self.tokenizer.vocab_size
+        return self._vocab_size
 
     @property
     def seed(self) -> int:
@@ -94,37 +111,302 @@ class BaseLMIterableDataset(BaseIterableDataset):
             input samples and target labels. The shape of tensors is [sequence length]. Otherwise,
             None is returned.
 
+        ...note:
+            This is a convenience wrapper around '_tokenize_batch' for a single text sequence.
+        """
+        return self._tokenize_batch([text])[0]
+
+    def _tokenize_batch(self, texts: List[str]) -> List[Optional[Dict[str, Tensor]]]:
+        """Convert a batch of input texts into tokens.
+
+        Args:
+            texts: List of input text sequences.
+
+        Returns:
+            A list with the same length as 'texts'. For valid sequences, the entry is a dictionary
+            containing 1D tensors with token indices for input samples and target labels. The shape
+            of tensors is [sequence length]. Otherwise, the entry is None.
+
         ...note:
             To study the effect of multiple tokenizations, we do 'on-the-fly' tokenization.
             Pre-training text corpora are often noisy and may contain low-length sequences.
             To deal such text sequences, we apply two filtering methods:
-                1. We process the text and check if the number of characters in the text sequence
-                    are less than the specified threshold or not. If it is, then we skip such sequences.
-                2. After tokenizing the sequence, we check for the number of tokens. If they are smaller
+                1. After tokenizing the sequence, we check for the number of tokens. If they are smaller
                     than the pre-defined threshold, then such sequences are skipped.
+                2. We process the text and check if the number of characters in the text sequence
+                    are less than the specified threshold or not. If it is, then we skip such sequences.
+
+            The texts are tokenized with a single call to the tokenizer, which amortizes the per-call
+            overhead of the tokenizer across the batch. Processing the text is often slower than tokenizing
+            it, so the character filter is only applied to sequences that pass the token filter. The processed
+            version of an ASCII text is never longer than the text itself, so ASCII sequences with fewer input
+            characters than the threshold are skipped before tokenization without processing them. This does
+            not hold for other texts, because lowercasing may lengthen some characters (e.g., 'İ').
+
+            The tokenizer truncates and pads the tokenized texts to 'sequence length + 1' tokens, and writes them
+            into a single tensor for the batch, so the samples are not padded one at a time.
         """
-        if len(_process_text(text)) < self.min_characters_per_text:
-            return None
+        outputs: List[Optional[Dict[str, Tensor]]] = [None] * len(texts)
+
+        candidate_indices = self._get_candidate_indices(texts)
+        if not candidate_indices:
+            return outputs
 
-        tokenized_text = self.tokenizer(text)
-        n_tokens = tokenized_text.shape[0]
+        content_tensor, num_tokens = self.tokenizer.tok_encode_batch_padded(
+            [texts[idx] for idx in candidate_indices],
+            length=self.sequence_length + 1,
+            padding_value=self._pad_token_id,
+            dtype=self._token_dtype,
+        )
+        for samples, targets, idx, num_tokens_i in zip(
+            *self._split_content_tensor(content_tensor), candidate_indices, num_tokens
+        ):
+            if self._is_valid_text(texts[idx], num_tokens_i):
+                outputs[idx] = {
+                    "samples": samples,
+                    "targets": targets,
+                }
+        return outputs
+
+    @staticmethod
+    def _split_content_tensor(
+        content_tensor: Tensor,
+    ) -> Tuple[Tuple[Tensor, ...], Tuple[Tensor, ...]]:
+        """Split a tensor of token indices into input samples and target labels.
+
+        Args:
+            content_tensor: A tensor of shape [num sequences, sequence length + 1] with token indices.
 
-        if n_tokens < self.min_tokens_per_text:
-            return None
+        Returns:
+            A tuple containing input samples and target labels for each sequence. The shape of each
+            tensor is [sequence length].
 
+        ...note:
+            Creating the views of all sequences at once with 'unbind' is about twice as fast as slicing
+            each sequence in Python, which matters because samples are created for every text sequence.
+        """
         # In language modeling, the target sequence is generated by shifting the input sequence by one position.
-        valid_seq_length = min(n_tokens, self.sequence_length + 1)
-        content_tensor = torch.full(
-            size=(self.sequence_length + 1,),
-            fill_value=self.pad_token_id,
-            dtype=torch.long,
+        return content_tensor[:, :-1].unbind(0), content_tensor[:, 1:].unbind(0)
+
+    def _split_tokenized_text(self, tokenized_text: Tensor) -> List[Tensor]:
+        """Split a tokenized text into windows with a sliding window.
+
+        Windows of 'sequence length + 1' tokens start every 'dataset.language_modeling.sliding_window_stride'
+        tokens. If the full-length windows do not cover the end of the text, the remaining tokens form a last,
+        shorter window. Text sequences that are shorter than a window yield a single window with all the tokens.
+
+        Args:
+            tokenized_text: 1D tensor with token indices.
+
+        Returns:
+            A list of 1D tensors with at most 'sequence length + 1' token indices each. The windows are views of
+            'tokenized_text', and are padded in '_make_samples'.
+        """
+        num_tokens = tokenized_text.shape[0]
+        packed_length = self.sequence_length + 1
+        stride = self.sliding_window_stride
+
+        starts = range(0, max(num_tokens - packed_length, 0) + 1, stride)
+        windows = [tokenized_text[start : start + packed_length] for start in starts]
+
+        tail_start = starts[-1] + stride
+        # The last window needs at least two tokens to contain a target label.
+        if starts[-1] + packed_length < num_tokens and tail_start < num_tokens - 1:
+            windows.append(tokenized_text[tail_start:])
+        return windows
+
+    def _filter_and_tokenize_batch(self, texts: List[str]) -> List[Tensor]:
+        """Tokenize a batch of input texts and filter out the low-length sequences.
+
+        See '_tokenize_batch' for details about filtering.
+
+        Args:
+            texts: List of input text sequences.
+
+        Returns:
+            A list of 1D tensors with the token indices of the valid text sequences, in the same order as 'texts'.
+        """
+        candidate_indices = self._get_candidate_indices(texts)
+        if not candidate_indices:
+            return []
+
+        tokenized_texts = self.tokenizer.tok_encode_batch(
+            [texts[idx] for idx in candidate_indices]
         )
+        return [
+            tokenized_text
+            for idx, tokenized_text in zip(candidate_indices, tokenized_texts)
+            if self._is_valid_text(texts[idx], tokenized_text.shape[0])
+        ]
+
+    def _get_candidate_indices(self, texts: List[str]) -> List[int]:
+        """Returns the indices of the texts that need to be tokenized.
+
+        The processed version of an ASCII text is never longer than the text itself, so ASCII texts with fewer
+        characters than 'dataset.language_modeling.min_characters_per_text' are skipped without tokenizing them.
+        Non-ASCII texts are always tokenized, because lowercasing may lengthen them.
+        """
+        min_chars = self.min_characters_per_text
+        if min_chars > 0:
+            return [
+                idx
+                for idx, text in enumerate(texts)
+                if len(text) >= min_chars or not text.isascii()
+            ]
+        return list(range(len(texts)))
+
+    def _is_valid_text(self, text: str, num_tokens: int) -> bool:
+        """Check if a tokenized text passes the filters. See '_tokenize_batch' for details.
+
+        Args:
+            text: Input text sequence.
+            num_tokens: Number of tokens in the tokenized text.
+
+        Returns:
+            True if the text sequence is valid, and False otherwise.
+        """
+        # The token filter is cheaper than the character filter, so it is applied first.
+        if num_tokens < self.min_tokens_per_text:
+            return False
+        return cleaned_length_at_least(text, self.min_characters_per_text)
+
+    def _tokenize_texts(self, texts: Iterable[str]) -> Iterator[Dict[str, Tensor]]:
+        """Tokenize a stream of texts in batches.
 
-        content_tensor[:valid_seq_length] = tokenized_text[:valid_seq_length]
-        return {
-            "samples": content_tensor[:-1],
-            "targets": content_tensor[1:],
-        }
+        Args:
+            texts: An iterable of input text sequences.
+
+        Yields:
+            A dictionary containing 1D tensors with token indices for input samples and target labels
+            for each valid text sequence, in the same order as 'texts'. Invalid sequences are skipped.
+            The shape of the tensors matches that of the output from the '_tokenize_text' function.
+
+        ...note:
+            When 'dataset.language_modeling.pack_sequences' is enabled, the valid text sequences are packed
+            into full-length sequences (see '_pack_tokenized_texts'), so a sample may contain tokens from
+            multiple text sequences. When 'dataset.language_modeling.sliding_window_stride' is set, long text
+            sequences are split into multiple samples (see '_split_tokenized_text').
+        """
+        if self.pack_sequences or self.sliding_window_stride is not None:
+            for batch in self._batch_texts(texts):
+                yield from self._make_samples(self._filter_and_tokenize_batch(batch))
+            return
+
+        # Samples are truncated or padded by the tokenizer in '_tokenize_batch'.
+        for batch in self._batch_texts(texts):
+            for sample in self._tokenize_batch(batch):
+                if sample is not None:
+                    yield sample
+
+    def _batch_texts(self, texts: Iterable[str]) -> Iterator[List[str]]:
+        """Group a stream of texts into lists of 'dataset.language_modeling.tokenizer_batch_size' texts."""
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == self.tokenizer_batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def _make_samples(
+        self, tokenized_texts: List[Tensor]
+    ) -> Iterator[Dict[str, Tensor]]:
+        """Convert tokenized texts into samples.
+
+        Args:
+            tokenized_texts: List of 1D tensors with token indices.
+
+        Yields:
+            A dictionary containing 1D tensors with token indices for input samples and target labels.
+            The shape of the tensors matches that of the output from the '_tokenize_text' function.
+
+        ...note:
+            Without packing, each tokenized text (or each window when 'dataset.language_modeling.sliding_window_stride'
+            is set) is truncated to 'sequence length + 1' tokens. When some of them are shorter, the padded content
+            of the whole batch is allocated and filled in a single 'pad_sequence' call rather than padding each
+            sample. When none of them needs padding, the samples are views of the tokenized texts.
+        """
+        if self.pack_sequences:
+            yield from self._pack_tokenized_texts(tokenized_texts)
+            return
+
+        packed_length = self.sequence_length + 1
+        if self.sliding_window_stride is not None:
+            windows = [
+                window
+                for tokenized_text in tokenized_texts
+                for window in self._split_tokenized_text(tokenized_text)
+            ]
+        else:
+            windows = [
+                tokenized_text[:packed_length] for tokenized_text in tokenized_texts
+            ]
+        if not windows:
+            return
+
+        if all(window.shape[0] == packed_length for window in windows):
+            for content in windows:
+                content = content.to(dtype=self._token_dtype)
+                yield {
+                    "samples": content[:-1],
+                    "targets": content[1:],
+                }
+            return
+
+        content_tensor = pad_sequence(
+            windows, batch_first=True, padding_value=self._pad_token_id
+        )
+        content_tensor = F.pad(
+            content_tensor,
+            pad=(0, packed_length - content_tensor.shape[1]),
+            value=self._pad_token_id,
+        ).to(dtype=self._token_dtype)
+        for samples, targets in zip(*self._split_content_tensor(content_tensor)):
+            yield {
+                "samples": samples,
+                "targets": targets,
+            }
+
+    def _pack_tokenized_texts(
+        self, tokenized_texts: List[Tensor]
+    ) -> Iterator[Dict[str, Tensor]]:
+        """Pack tokenized texts into full-length sequences.
+
+        The tokenized texts are concatenated, separated by the end of text token, and split into sequences
+        of 'sequence length + 1' tokens without padding. The tokens that do not fill a sequence are carried
+        over to the next call.
+
+        Args:
+            tokenized_texts: List of 1D tensors with token indices.
+
+        Yields:
+            A dictionary containing 1D tensors with token indices for input samples and target labels.
+            The shape of the tensors matches that of the output from the '_tokenize_text' function.
+        """
+        eot_token = torch.tensor([self._eot_token_id], dtype=self._token_dtype)
+        token_stream = [self._packing_carry]
+        for tokenized_text in tokenized_texts:
+            if tokenized_text.shape[0] == 0:
+                continue
+            token_stream.append(tokenized_text.to(dtype=self._token_dtype))
+            if tokenized_text[-1] != self._eot_token_id:
+                token_stream.append(eot_token)
+        token_stream = torch.cat(token_stream)
+
+        packed_length = self.sequence_length + 1
+        num_sequences = token_stream.shape[0] // packed_length
+        self._packing_carry = token_stream[num_sequences * packed_length :].clone()
+
+        content_tensor = token_stream[: num_sequences * packed_length].view(
+            num_sequences, packed_length
+        )
+        for samples, targets in zip(*self._split_content_tensor(content_tensor)):
+            yield {
+                "samples": samples,
+                "targets": targets,
+            }
 
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
@@ -150,6 +432,28 @@ class BaseLMIterableDataset(BaseIterableDataset):
                 help="Minimum number of characters in a text sequence before tokenization. "
                 "This flag allows us to skip short text sequences. Defaults to 0.",
             )
+            group.add_argument(
+                "--dataset.language-modeling.tokenizer-batch-size",
+                type=int,
+                default=64,
+                help="Number of text sequences that are passed to the tokenizer at once. "
+                "Tokenizing multiple text sequences per call amortizes the tokenizer overhead. Defaults to 64.",
+            )
+            group.add_argument(
+                "--dataset.language-modeling.pack-sequences",
+                action="store_true",
+                default=False,
+                help="Pack consecutive text sequences, separated by the end of text token, into full-length sequences "
+                "instead of padding each text sequence. This avoids computing on padding tokens. Defaults to False.",
+            )
+            group.add_argument(
+                "--dataset.language-modeling.sliding-window-stride",
+                type=int,
+                default=None,
+                help="Split each text sequence into multiple samples with a sliding window of 'sequence length + 1' "
+                "tokens and the given stride, instead of truncating it to a single sample. A stride equal to the "
+                "sequence length yields non-overlapping samples. Defaults to None (i.e., text sequences are truncated).",
+            )
             group.add_argument(
                 "--dataset.language-modeling.shuffle-data",
                 action="store_true",
@@ -203,6 +507,10 @@ class BaseLMIterableDataset(BaseIterableDataset):
             the input and label of a sample, respectively. The shape of input and label tensors is [sequence length].
         """
 
+        if self.pack_sequences:
+            # Tokens carried over from the previous iteration are dropped.
+            self._packing_carry = self._packing_carry[:0]
+
         # scale the rank and world size to deal with multiprocessing and distributed training.
         scaled_world_size = self.world_size * self.num_workers
         scaled_rank = self.rank * self.num_workers + self.worker_id
@@ -216,5 +524,8 @@ class BaseLMIterableDataset(BaseIterableDataset):
             f"\n\tpad_token_id={self.pad_token_id}"
             f"\n\tmin_characters_per_text={self.min_characters_per_text}"
             f"\n\tmin_tokens_per_text={self.min_tokens_per_text}"
+            f"\n\ttokenizer_batch_size={self.tokenizer_batch_size}"
+            f"\n\tpack_sequences={self.pack_sequences}"
+            f"\n\tsliding_window_stride={self.sliding_window_stride}"
             f"\n\tshuffle={self.shuffle_data}"
         )
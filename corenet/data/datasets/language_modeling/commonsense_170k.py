@@ -9,6 +9,7 @@ import fcntl
 import os
 from typing import Dict, Iterator
 
+import numpy as np
 import pandas as pd
 from torch import Tensor
 
@@ -55,15 +56,16 @@ class CommonSense170k(BaseLMIterableDataset):
         self, scaled_rank: int, scaled_world_size: int
     ) -> Iterator[Dict[str, Tensor]]:
         num_elems = len(self.data)
-        chosen_elems = list(range(scaled_rank, num_elems, scaled_world_size))
-        self._rng.shuffle(chosen_elems)
+        chosen_elems = self._rng.permutation(
+            np.arange(scaled_rank, num_elems, scaled_world_size)
+        )
         shuffled_data = self.data.loc[chosen_elems]
 
-        for sample in shuffled_data.iterrows():
-            sample = sample[1].to_dict()
-            sample = generate_prompt_and_response(sample)
-            tokenized_sample = self._tokenize_text(sample)
-            yield tokenized_sample
+        samples = (
+            generate_prompt_and_response(sample[1].to_dict())
+            for sample in shuffled_data.iterrows()
+        )
+        yield from self._tokenize_texts(samples)
 
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
@@ -6,6 +6,7 @@
 
 import argparse
 import fcntl
+import hashlib
 import math
 import os
 import pickle
@@ -14,7 +15,9 @@ from functools import partial
 from pathlib import Path
 from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+import torch
 from pyarrow import parquet as pq
 from torch import Tensor
 
@@ -53,6 +56,12 @@ def check_list_of_dicts_with_mandatory_keys(
             )
 
 
+# Tokenizer options that do not change the tokens, so they are not part of the tokenizer cache key.
+_TOKENIZER_OPTS_NOT_AFFECTING_TOKENS = {
+    "text_tokenizer.sentence_piece.num_threads",
+}
+
+
 @DATASET_REGISTRY.register(name="general_lm", type="language_modeling")
 class GeneralLMDataset(BaseLMIterableDataset):
     """
@@ -117,6 +126,14 @@ class GeneralLMDataset(BaseLMIterableDataset):
                 type=int,
                 help="Data state save interval in minutes. Defaults to 15 minutes.",
             )
+            group.add_argument(
+                "--dataset.language-modeling.general-lm.tokenizer-cache-dir",
+                default=None,
+                type=str,
+                help="Directory where the tokenized text sequences of each file are cached after the file is read "
+                "for the first time. Subsequent epochs read the tokens from the cache instead of tokenizing the "
+                "file again. Defaults to None (i.e., text sequences are tokenized on-the-fly in every epoch).",
+            )
 
         return parser
 
@@ -129,25 +146,35 @@ class GeneralLMDataset(BaseLMIterableDataset):
             3. chunk: Chunk index. Note that each file may contains multiple documents, and for efficiency,
                 we read them in chunks.
             4. _time: Time (in seconds) at which state is saved.
+            5. random_generator: Name of the random generator that shuffles the files. The file order
+                depends on it, so a state can only be resumed with the same generator.
         """
         self._state = {
             "epoch": 0,
             "file": None,
             "chunk": 0,
             "_time": 0,
+            "random_generator": self._random_generator_name,
         }
         self._target_state = {
             "epoch": 0,
             "file": None,
             "chunk": 0,
             "_time": 0,
+            "random_generator": self._random_generator_name,
         }
 
+    @property
+    def _random_generator_name(self) -> str:
+        """Name of the bit generator used for shuffling (e.g., 'PCG64')."""
+        return type(self._rng.bit_generator).__name__
+
     def extra_repr(self) -> str:
         return super().extra_repr() + (
             f"\n\tnum_files={self.num_files}"
             f"\n\tdocument_split_size={self.document_split_size}"
             f"\n\treader_chunk_size={self.reader_chunk_size}"
+            f"\n\ttokenizer_cache_dir={self.tokenizer_cache_dir}"
         )
 
     @property
@@ -157,6 +184,13 @@ class GeneralLMDataset(BaseLMIterableDataset):
             self.opts, "dataset.language_modeling.general_lm.reader_chunk_size"
         )
 
+    @property
+    def tokenizer_cache_dir(self) -> Optional[str]:
+        """Directory where the tokenized text sequences are cached."""
+        return getattr(
+            self.opts, "dataset.language_modeling.general_lm.tokenizer_cache_dir"
+        )
+
     @property
     def save_loc(self) -> str:
         """Location path where artifacts (e.g., data state) will be stored."""
@@ -207,6 +241,17 @@ class GeneralLMDataset(BaseLMIterableDataset):
                 with open(data_state_fpath, "rb") as fh:
                     self._target_state = pickle.load(fh)
 
+                # States saved before the random generator was recorded were shuffled with 'random.Random'.
+                saved_random_generator = self._target_state.get(
+                    "random_generator", "random.Random"
+                )
+                if saved_random_generator != self._random_generator_name:
+                    logger.error(
+                        f"Data state {data_state_fpath} was saved with the {saved_random_generator} random generator, "
+                        f"but files are shuffled with the {self._random_generator_name} random generator. Resuming "
+                        "would skip or repeat files because the file order differs. Please resume without the data state."
+                    )
+
                 logger.info(
                     f"Loaded dataset state {self._target_state} from {data_state_fpath} for {self.worker_id} worker on {self.rank}."
                 )
@@ -458,17 +503,14 @@ class GeneralLMDataset(BaseLMIterableDataset):
         """
 
         pq_table = pq.ParquetFile(file_path, **reader_kwargs)
-        for document_chunks in self._skip_document_chunks(
+        yield from self._tokenize_document_chunks(
             pq_table.iter_batches(
                 batch_size=self.reader_chunk_size,
                 columns=[text_key],
-            )
-        ):
-            document_chunks_pd = document_chunks.to_pandas()[text_key]
-            for text in self._split_document_into_sequences(document_chunks_pd):
-                tokenized_text = self._tokenize_text(text)
-                if tokenized_text is not None:
-                    yield tokenized_text
+            ),
+            get_documents=lambda document_chunks: document_chunks.to_pandas()[text_key],
+            file_path=file_path,
+        )
 
     def _read_data_from_json(
         self, file_path: str, text_key: str, **reader_kwargs
@@ -488,12 +530,166 @@ class GeneralLMDataset(BaseLMIterableDataset):
         document_chunks = pd.read_json(
             file_path, lines=True, chunksize=self.reader_chunk_size, **reader_kwargs
         )
-        for documents in self._skip_document_chunks(document_chunks):
-            # each chunk contains multiple text
-            for text in self._split_document_into_sequences(documents[text_key]):
-                tokenized_text = self._tokenize_text(text)
-                if tokenized_text is not None:
-                    yield tokenized_text
+        # each chunk contains multiple text
+        yield from self._tokenize_document_chunks(
+            document_chunks,
+            get_documents=lambda documents: documents[text_key],
+            file_path=file_path,
+        )
+
+    def _tokenize_document_chunks(
+        self,
+        document_chunks: Iterable[Any],
+        get_documents: Callable[[Any], Iterable[str]],
+        file_path: str,
+    ) -> Iterator[Dict[str, Tensor]]:
+        """Tokenize chunks of documents read from a file.
+
+        When 'dataset.language_modeling.general_lm.tokenizer_cache_dir' is specified and the file is read
+        from the beginning, the tokenized text sequences are also written to the cache. See
+        '_read_data_from_tokenizer_cache' for the format of the cache.
+
+        Args:
+            document_chunks: An iterable over chunks of documents.
+            get_documents: A function that returns the text documents in a chunk. It is only called for the
+                chunks that are not skipped when resuming, so skipped chunks are not converted.
+            file_path: Local path of the file containing the documents.
+
+        Yields:
+            A dictionary containing 1D tensors with token indices for input samples and target labels.
+            The shape of the tensors matches that of the output from the '_tokenize_text' function.
+        """
+        cache_path = self._get_tokenizer_cache_path(file_path)
+        if cache_path is None or self._target_state["chunk"] > 0:
+            # The cache can only be written when all chunks of the file are tokenized.
+            for documents in self._skip_document_chunks(document_chunks):
+                yield from self._tokenize_texts(
+                    self._split_document_into_sequences(get_documents(documents))
+                )
+            return
+
+        # The tokens are written to a temporary file while the file is read, and the cache is
+        # created only after the last chunk, so that incomplete caches are never read.
+        tmp_cache_path = f"{cache_path}.{os.getpid()}.tmp"
+        num_tokens = 0
+        text_offsets = [0]
+        chunk_offsets = [0]
+        try:
+            with open(tmp_cache_path, "wb") as cache_file:
+                for documents in self._skip_document_chunks(document_chunks):
+                    for batch in self._batch_texts(
+                        self._split_document_into_sequences(get_documents(documents))
+                    ):
+                        tokenized_texts = self._filter_and_tokenize_batch(batch)
+                        for tokenized_text in tokenized_texts:
+                            cache_file.write(
+                                tokenized_text.to(dtype=self._token_dtype)
+                                .numpy()
+                                .tobytes()
+                            )
+                            num_tokens += tokenized_text.shape[0]
+                            text_offsets.append(num_tokens)
+                        yield from self._make_samples(tokenized_texts)
+                    chunk_offsets.append(len(text_offsets) - 1)
+        except BaseException:
+            # The file was not fully read (e.g., the iteration was stopped), so the tokens are discarded.
+            os.remove(tmp_cache_path)
+            raise
+
+        cache_index = {
+            "dtype": str(self._token_dtype).replace("torch.", ""),
+            "text_offsets": np.array(text_offsets, dtype=np.int64),
+            "chunk_offsets": np.array(chunk_offsets, dtype=np.int64),
+        }
+        with open(f"{tmp_cache_path}.index", "wb") as fh:
+            pickle.dump(cache_index, fh)
+        # 'os.replace' is atomic, and the index is moved last because its presence marks a complete cache.
+        os.replace(tmp_cache_path, cache_path)
+        os.replace(f"{tmp_cache_path}.index", f"{cache_path}.index")
+
+    def _get_tokenizer_cache_path(self, file_path: str) -> Optional[str]:
+        """Returns the path of the tokenizer cache for a file.
+
+        The cache is specific to the file content, to the tokenizer options and model files, and to the
+        options that affect filtering, so that changing the tokenizer (including replacing its model file
+        at the same path) or the filtering options does not read stale tokens. Tokenizer options that do
+        not change the tokens (e.g., the number of encoding threads) are left out, so they don't invalidate
+        the cache. Files are identified by their path, size, and modification time.
+
+        Args:
+            file_path: Local path of the file.
+
+        Returns:
+            The path of the cache file, or None if 'dataset.language_modeling.general_lm.tokenizer_cache_dir'
+            is not specified.
+        """
+        cache_dir = self.tokenizer_cache_dir
+        if cache_dir is None:
+            return None
+
+        def file_signature(path: str) -> Tuple[str, int, int]:
+            path_stat = os.stat(path)
+            return os.path.abspath(path), path_stat.st_size, path_stat.st_mtime_ns
+
+        tokenizer_opts = sorted(
+            (key, str(value))
+            for key, value in vars(self.opts).items()
+            if key.startswith("text_tokenizer.")
+            and key not in _TOKENIZER_OPTS_NOT_AFFECTING_TOKENS
+        )
+        cache_key = repr(
+            (
+                file_signature(file_path),
+                tokenizer_opts,
+                [file_signature(path) for path in self.tokenizer.model_file_paths],
+                self.min_tokens_per_text,
+                self.min_characters_per_text,
+                self.document_split_size,
+                self.reader_chunk_size,
+                str(self._token_dtype),
+            )
+        )
+        Path(cache_dir).mkdir(exist_ok=True, parents=True)
+        cache_name = hashlib.sha256(cache_key.encode("utf-8")).hexdigest()
+        return f"{cache_dir}/{cache_name}.bin"
+
+    def _read_data_from_tokenizer_cache(
+        self, cache_path: str
+    ) -> Iterator[Dict[str, Tensor]]:
+        """Read tokenized text sequences from the tokenizer cache.
+
+        The cache consists of two files:
+            1. A binary file containing the token indices of all valid text sequences in a file, which is
+                memory-mapped so that the tokens are read from disk without copies.
+            2. An index file ('.index' suffix) containing the dtype of the tokens, the token offset of each text
+                sequence, and the text sequence offset of each document chunk. The chunk offsets allow us to resume
+                from the same chunk as when reading the original file.
+
+        Args:
+            cache_path: Path of the cache file.
+
+        Yields:
+            A dictionary containing 1D tensors with token indices for input samples and target labels.
+            The shape of the tensors matches that of the output from the '_tokenize_text' function.
+        """
+        with open(f"{cache_path}.index", "rb") as fh:
+            cache_index = pickle.load(fh)
+        text_offsets = cache_index["text_offsets"]
+        chunk_offsets = cache_index["chunk_offsets"]
+
+        if text_offsets[-1] > 0:
+            # Copy-on-write mapping avoids read-only arrays, which can't be shared with PyTorch without copies.
+            tokens = np.memmap(cache_path, dtype=cache_index["dtype"], mode="c")
+        else:
+            # Empty files can't be memory-mapped.
+            tokens = np.empty((0,), dtype=cache_index["dtype"])
+
+        for chunk_id in self._skip_document_chunks(range(len(chunk_offsets) - 1)):
+            tokenized_texts = [
+                torch.from_numpy(tokens[text_offsets[idx] : text_offsets[idx + 1]])
+                for idx in range(chunk_offsets[chunk_id], chunk_offsets[chunk_id + 1])
+            ]
+            yield from self._make_samples(tokenized_texts)
 
     def _get_file_reader(self, file_path: str) -> Callable:
         """Returns the function used to read a file based on its extension."""
@@ -591,9 +787,12 @@ class GeneralLMDataset(BaseLMIterableDataset):
                 if prev_file_path is None:
                     prev_file_path = local_file_path
 
-                reader = self._get_file_reader(file_path=local_file_path)
-
-                yield from reader(file_path=local_file_path, text_key=text_key)
+                cache_path = self._get_tokenizer_cache_path(local_file_path)
+                if cache_path is not None and os.path.isfile(f"{cache_path}.index"):
+                    yield from self._read_data_from_tokenizer_cache(cache_path)
+                else:
+                    reader = self._get_file_reader(file_path=local_file_path)
+                    yield from reader(file_path=local_file_path, text_key=text_key)
                 self._save_data_state(file=remote_file_path)
 
             self._save_data_state(epoch=epoch_counter + 1)
@@ -617,10 +816,11 @@ class GeneralLMDataset(BaseLMIterableDataset):
             and testing when k is not specified, it does not perform any operation.
         """
         if self.is_training or k is not None:
-            _temp = list(zip(file_names, text_keys))
             if k is not None:
-                _temp = self._rng.choices(_temp, k=k)
+                # Files are selected with replacement.
+                indices = self._rng.integers(len(file_names), size=k)
             else:
-                self._rng.shuffle(_temp)
-            return zip(*_temp)
+                indices = self._rng.permutation(len(file_names))
+            file_names = [file_names[idx] for idx in indices]
+            text_keys = [text_keys[idx] for idx in indices]
         return file_names, text_keys
@@ -0,0 +1,100 @@
+#
+# For licensing see accompanying LICENSE file.
+# Copyright (C) 2024 Apple Inc. All Rights Reserved.
+#
+
+"""Text processing used to filter low-length content in language modeling datasets.
+
+The functions in this module are called for every text sequence by the data workers. The module
+only depends on the standard library, so that it can optionally be compiled with mypyc (see
+'setup.py'). The pure Python module is used when it is not compiled.
+"""
+
+import string
+
+# The punctuation set and the translation table are built once at import time.
+_PUNCT_CHARS = frozenset(string.punctuation)
+# Byte-level table for ASCII text: whitespaces (as defined by 'str.isspace', which includes the
+# separators '\x1c' to '\x1f' that 'bytes.split' keeps) map to a space, and punctuation is deleted.
+# Lowercasing does not change the length of ASCII text, so letters are kept as they are.
+_ASCII_PUNCT_BYTES = string.punctuation.encode("ascii")
+_ASCII_TABLE = bytes(
+    ord(" ") if byte < 128 and chr(byte).isspace() else byte for byte in range(256)
+)
+
+
+def _process_ascii(data: bytes) -> bytes:
+    """Remove punctuation from ASCII-encoded text and collapse whitespace runs into single spaces.
+
+    Whitespace mapping and punctuation removal are done with a single 256-entry table lookup per byte
+    inside 'bytes.translate', and whitespace runs are collapsed by 'bytes.split', so the per-character
+    work runs in C.
+    """
+    return b" ".join(data.translate(_ASCII_TABLE, _ASCII_PUNCT_BYTES).split())
+
+
+def cleaned_length_ascii(data: bytes) -> int:
+    """Compute the length of the processed text for ASCII-encoded text.
+
+    Args:
+        data: ASCII-encoded input text sequence.
+
+    Returns:
+        The length of the processed text.
+    """
+    return len(_process_ascii(data))
+
+
+def cleaned_length_at_least(text: str, threshold: int) -> bool:
+    """Check if the processed text has at least 'threshold' characters without materializing it.
+
+    The text is processed as in SlimPajama: it is lowercased, punctuation is removed, leading and
+    trailing whitespaces are stripped, and whitespace runs are replaced with a single space.
+
+    Citation:
+        @misc{cerebras2023slimpajama,
+            author = {Soboleva, Daria and Al-Khateeb, Faisal and Myers, Robert and Steeves, Jacob R and Hestness, Joel and Dey, Nolan},
+            title = {{SlimPajama: A 627B token cleaned and deduplicated version of RedPajama}},
+            month = June,
+            year = 2023,
+            url = {https://huggingface.co/datasets/cerebras/SlimPajama-627B},
+            howpublished = {https://www.cerebras.net/blog/slimpajama-a-627b-token-cleaned-and-deduplicated-version-of-redpajama},
+        }
+
+    The text is scanned once, skipping punctuation, counting the length of each kept character after
+    lowercasing, and counting a single space for each run of whitespaces between two kept characters.
+    The scan stops as soon as the count reaches the threshold, so the cost for long text sequences is
+    proportional to the threshold rather than to the length of the text.
+
+    Args:
+        text: Input text sequence.
+        threshold: Minimum number of characters in the processed text.
+
+    Returns:
+        True if the processed text has at least 'threshold' characters, and False otherwise.
+
+    ...note:
+        Pre-training corpora are mostly ASCII. Such text sequences are counted on bytes with
+        'cleaned_length_ascii', which is much faster than scanning the characters in Python.
+    """
+    if threshold <= 0:
+        return True
+    if text.isascii():
+        return cleaned_length_ascii(text.encode("ascii")) >= threshold
+
+    length = 0
+    pending_space = False
+    for char in text:
+        if char in _PUNCT_CHARS:
+            continue
+        if char.isspace():
+            # Leading and trailing whitespaces are stripped, so a space is counted only when
+            # it is followed by a kept character.
+            pending_space = length > 0
+            continue
+        # A few characters (e.g., 'İ') lowercase to more than one character.
+        length += len(char.lower()) + (1 if pending_space else 0)
+        pending_space = False
+        if length >= threshold:
+            return True
+    return False
@@ -4,8 +4,10 @@
 #
 
 import argparse
-from typing import Any
+from typing import Any, List, Sequence, Tuple, Union
 
+import numpy as np
+import torch
 from torch import Tensor, nn
 
 from corenet.utils import logger
@@ -60,6 +62,15 @@ class BaseTextTokenizer(nn.Module):
         """Text vocabulary size."""
         raise NotImplementedError("Child classes must implement this method.")
 
+    @property
+    def model_file_paths(self) -> List[str]:
+        """Local paths of the files (e.g., vocabulary or model files) that the tokenizer is loaded from.
+
+        These files allow detecting changes of the tokenizer when its options do not change (e.g., a model
+        file replaced at the same path). Defaults to an empty list.
+        """
+        return []
+
     @property
     def eot_token(self) -> str:
         """End of text token."""
@@ -109,6 +120,77 @@ class BaseTextTokenizer(nn.Module):
         """Encodes a sentence into a tensor of token ids."""
         raise NotImplementedError("Child classes must implement this method.")
 
+    def tok_encode_batch(self, input_sentences: List[str]) -> List[Tensor]:
+        """Encodes a list of sentences into a list of tensors of token ids.
+
+        Child classes backed by a native tokenizer library can override this method to encode
+        all sentences in a single call. By default, sentences are encoded one at a time.
+        """
+        return [self.tok_encode(input_sentence) for input_sentence in input_sentences]
+
+    def tok_encode_batch_padded(
+        self,
+        input_sentences: List[str],
+        length: int,
+        padding_value: int,
+        dtype: torch.dtype = torch.int64,
+    ) -> Tuple[Tensor, List[int]]:
+        """Encodes a list of sentences into a single tensor of token ids with a fixed length.
+
+        Args:
+            input_sentences: Input sentences to be tokenized.
+            length: Number of tokens per sentence. Longer sentences are truncated and shorter
+                sentences are padded with 'padding_value' on the right.
+            padding_value: Token index used for padding.
+            dtype: Data type of the returned token ids. Defaults to torch.int64.
+
+        Returns:
+            A tuple of two elements. The first element is a tensor of shape [len(input_sentences), length]
+            containing token indices. The second element is a list containing the number of tokens of each
+            sentence before truncation.
+        """
+        return self._pad_token_ids(
+            self.tok_encode_batch(input_sentences),
+            length=length,
+            padding_value=padding_value,
+            dtype=dtype,
+        )
+
+    @staticmethod
+    def _to_tensor(token_ids: Sequence[Union[int, str]]) -> Tensor:
+        """Convert a sequence of token ids (integers, or strings of integers) into a 1D tensor of int64 token ids."""
+        # Converting a list to a numpy array is faster than converting it to a tensor, and
+        # 'torch.from_numpy' does not copy the data.
+        return torch.from_numpy(np.array(token_ids, dtype=np.int64))
+
+    @staticmethod
+    def _pad_token_ids(
+        token_ids: Sequence[Sequence[int]],
+        length: int,
+        padding_value: int,
+        dtype: torch.dtype,
+    ) -> Tuple[Tensor, List[int]]:
+        """Truncate or pad sequences of token ids and write them into a single tensor.
+
+        See 'tok_encode_batch_padded' for arguments and return values.
+
+        ...note:
+            The token ids are written into a tensor that is allocated once for all the sequences, and only
+            the first 'length' token ids of each sequence are converted. Child classes that obtain token ids
+            as lists from a native library can pass the lists directly.
+        """
+        padded_token_ids = torch.full(
+            size=(len(token_ids), length), fill_value=padding_value, dtype=dtype
+        )
+        # Writing into the numpy view avoids creating a tensor for each sequence.
+        padded_token_ids_np = padded_token_ids.numpy()
+        num_tokens = []
+        for row, token_ids_i in enumerate(token_ids):
+            num_tokens.append(len(token_ids_i))
+            token_ids_i = token_ids_i[:length]
+            padded_token_ids_np[row, : len(token_ids_i)] = token_ids_i
+        return padded_token_ids, num_tokens
+
     def tok_decode(self, token_ids: Any) -> str:
         """Decodes token ids into a sentence."""
         raise NotImplementedError("Child classes must implement this method.")
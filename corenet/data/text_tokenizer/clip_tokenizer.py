@@ -4,8 +4,8 @@
 #
 
 import argparse
+from typing import List
 
-import torch
 from torch import Tensor
 from torchtext.transforms import CLIPTokenizer
 
@@ -51,6 +51,7 @@ class ClipTokenizer(BaseTextTokenizer):
         )
         # BPE encodings is a dict, where  keys are tokens and values are token_ids
         self.bpe_encodings = self.tokenizer.bpe.bpe_encoder_
+        self._model_file_paths = [merges_path, encoder_json_path]
 
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
@@ -72,6 +73,11 @@ class ClipTokenizer(BaseTextTokenizer):
             )
         return parser
 
+    @property
+    def model_file_paths(self) -> List[str]:
+        """Local paths of the BPE merges and encoder JSON files."""
+        return self._model_file_paths
+
     @property
     def vocab_size(self) -> int:
         """Text vocabulary size."""
@@ -104,10 +110,6 @@ class ClipTokenizer(BaseTextTokenizer):
             SOT and EOT tokens are added to input sentence before tokenization.
         """
         input_sentence = f"{self.sot_token} {input_sentence} {self.eot_token}"
-        # tokenizer returns indices as a string
+        # tokenizer returns indices as strings, which numpy parses into integers.
         tokenized_sentence = self.tokenizer(input_sentence)
-        # convert string to int and then create a tensor
-        tokenized_sentence = torch.tensor(
-            [int(cap) for cap in tokenized_sentence], dtype=torch.long
-        )
-        return tokenized_sentence
+        return self._to_tensor(tokenized_sentence)
@@ -5,7 +5,7 @@
 
 import argparse
 from argparse import Namespace
-from typing import List, Union
+from typing import List, Tuple, Union
 
 import ftfy
 import torch
@@ -55,6 +55,7 @@ class SentencePieceTokenizer(BaseTextTokenizer):
         self.log_warning_once_on_rank0_worker0 = is_rank_0_worker_0(opts)
 
         self.sp_model = SentencePieceProcessor(model_file=spm_model_local_path)
+        self._model_file_paths = [spm_model_local_path]
 
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
@@ -85,9 +86,23 @@ class SentencePieceTokenizer(BaseTextTokenizer):
                 default=False,
                 help="Append end of text token after tokenized text. Defaults to False.",
             )
+            group.add_argument(
+                "--text-tokenizer.sentence-piece.num-threads",
+                type=int,
+                default=1,
+                help="Number of threads used by the sentence piece library to encode a batch of sentences. "
+                "The tokenizer usually runs inside many data loader workers, so each worker encodes with a single "
+                "thread by default to avoid oversubscribing the CPU. A value of -1 uses the library's default "
+                "(i.e., up to the number of hardware threads per call). Defaults to 1.",
+            )
 
         return parser
 
+    @property
+    def model_file_paths(self) -> List[str]:
+        """Local path of the sentence piece model."""
+        return self._model_file_paths
+
     @property
     def vocab_size(self) -> int:
         """Vocabulary size."""
@@ -149,23 +164,66 @@ class SentencePieceTokenizer(BaseTextTokenizer):
         Returns:
             A tensor containing token indices.
         """
+        return self.tok_encode_batch([input_sentence])[0]
 
-        if getattr(self.opts, "text_tokenizer.sentence_piece.enable_nfc_normalization"):
-            # normalize the text
-            input_sentence = ftfy.fix_text(input_sentence, normalization="NFC")
+    def tok_encode_batch(self, input_sentences: List[str]) -> List[Tensor]:
+        """Encodes a list of sentences into a list of tensors of token ids.
 
-        # tokenized sequence is returned as a list.
-        tokenized_seq = self.sp_model.Encode(input_sentence)
+        The sentences are passed to the sentence piece library in a single call, which encodes
+        them natively (and in parallel, using 'text_tokenizer.sentence_piece.num_threads' threads)
+        instead of invoking the tokenizer once per sentence.
+
+        Args:
+            input_sentences: Input sentences to be tokenized.
 
-        if getattr(self.opts, "text_tokenizer.sentence_piece.append_sot_token"):
-            tokenized_seq = [self.sot_token_id] + tokenized_seq
+        Returns:
+            A list of tensors containing token indices, one for each input sentence.
+        """
+        return [
+            self._to_tensor(tokenized_seq)
+            for tokenized_seq in self._encode_token_ids(input_sentences)
+        ]
+
+    def tok_encode_batch_padded(
+        self,
+        input_sentences: List[str],
+        length: int,
+        padding_value: int,
+        dtype: torch.dtype = torch.int64,
+    ) -> Tuple[Tensor, List[int]]:
+        """Encodes a list of sentences into a single tensor of token ids with a fixed length.
+
+        The lists of token ids returned by the sentence piece library are written directly into the
+        padded tensor. See 'BaseTextTokenizer.tok_encode_batch_padded' for arguments and return values.
+        """
+        return self._pad_token_ids(
+            self._encode_token_ids(input_sentences),
+            length=length,
+            padding_value=padding_value,
+            dtype=dtype,
+        )
 
-        if getattr(self.opts, "text_tokenizer.sentence_piece.append_eot_token"):
-            tokenized_seq = tokenized_seq + [self.eot_token_id]
+    def _encode_token_ids(self, input_sentences: List[str]) -> List[List[int]]:
+        """Encodes a list of sentences into lists of token ids with the sentence piece library."""
+        if getattr(self.opts, "text_tokenizer.sentence_piece.enable_nfc_normalization"):
+            # normalize the text
+            input_sentences = [
+                ftfy.fix_text(input_sentence, normalization="NFC")
+                for input_sentence in input_sentences
+            ]
 
-        # convert a list into tensor
-        tokenized_seq = torch.tensor(tokenized_seq, dtype=torch.long)
-        return tokenized_seq
+        # Start and end of text tokens are added by the sentence piece library, so
+        # that the tokenized sequences are not concatenated in Python.
+        return self.sp_model.Encode(
+            input_sentences,
+            add_bos=getattr(
+                self.opts, "text_tokenizer.sentence_piece.append_sot_token"
+            ),
+            add_eos=getattr(
+                self.opts, "text_tokenizer.sentence_piece.append_eot_token"
+            ),
+            num_threads=getattr(self.opts, "text_tokenizer.sentence_piece.num_threads"),
+        )
 
     def tok_decode(self, token_ids: Union[torch.Tensor, List[int]]) -> str:
         """Decodes token ids into a sentence.
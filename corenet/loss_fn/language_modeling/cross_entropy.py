@@ -93,7 +93,8 @@ class CrossEntropyLM(BaseLanguageModelingCriteria):
 
         batch_size, seq_length, vocab_size = prediction.shape
         prediction = prediction.reshape(batch_size * seq_length, vocab_size)
-        target = target.reshape(batch_size * seq_length)
+        # Language modeling datasets may yield 32-bit token indices, while cross-entropy expects 64-bit indices.
+        target = target.reshape(batch_size * seq_length).long()
         ce_loss = F.cross_entropy(
             input=prediction,
             target=target,
@@ -97,6 +97,7 @@ class OpenAIClipTokenizer(BaseTextTokenizer):
 
         # merges contain pair of tokens that are frequently appearing in the corpora.
         # Example: ['i n', 't h', 'a n', 'r e', 'a r', 'e r', 'th e</w>', 'in g</w>', 'o u']
+        self._model_file_paths = [bpe_path]
         merges = gzip.open(bpe_path).read().decode("utf-8").split("\n")
 
         # Note 1: index 0 in merges file contain version information (e.g., 'bpe_simple_vocab_16e6.txt#version: 0.2').
@@ -145,6 +146,11 @@ class OpenAIClipTokenizer(BaseTextTokenizer):
             )
         return parser
 
+    @property
+    def model_file_paths(self) -> List[str]:
+        """Local path of the BPE merges file."""
+        return self._model_file_paths
+
     @property
     def vocab_size(self) -> int:
         """Text vocabulary size."""
@@ -241,6 +247,33 @@ class OpenAIClipTokenizer(BaseTextTokenizer):
             Special tokens SOT (Start of Text) and EOT (End of Text) are added to the input
             sentence before tokenization.
         """
+        bpe_tokens = self._encode_token_ids(input_sentence)
+        return self._to_tensor(bpe_tokens)
+
+    def tok_encode_batch_padded(
+        self,
+        input_sentences: List[str],
+        length: int,
+        padding_value: int,
+        dtype: torch.dtype = torch.int64,
+    ) -> Tuple[Tensor, List[int]]:
+        """Encodes a list of sentences into a single tensor of token IDs with a fixed length.
+
+        The lists of token IDs are written directly into the padded tensor. See
+        'BaseTextTokenizer.tok_encode_batch_padded' for arguments and return values.
+        """
+        return self._pad_token_ids(
+            [
+                self._encode_token_ids(input_sentence)
+                for input_sentence in input_sentences
+            ],
+            length=length,
+            padding_value=padding_value,
+            dtype=dtype,
+        )
+
+    def _encode_token_ids(self, input_sentence: str) -> List[int]:
+        """Encodes a sentence, with SOT and EOT tokens, into a list of token IDs."""
         input_sentence = f"{self.sot_token} {input_sentence} {self.eot_token}"
         bpe_tokens = []
         for token in re.findall(self.pat, input_sentence):
@@ -248,8 +281,7 @@ class OpenAIClipTokenizer(BaseTextTokenizer):
             bpe_tokens.extend(
                 self.encoder[bpe_token] for bpe_token in self._bpe(token).split(" ")
             )
-        bpe_tokens_tensor = torch.tensor(bpe_tokens, dtype=torch.long)
-        return bpe_tokens_tensor
+        return bpe_tokens
 
     def tok_decode(self, token_ids: Union[List[int], Tensor]) -> str:
         """Decodes list of token ids into a sentence.
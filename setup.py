@@ -7,8 +7,9 @@ import os
 import platform
 import re
 import sys
+import warnings
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List
 
 from setuptools import find_packages, setup
 
@@ -30,6 +31,53 @@ def parse_requirements(path: str) -> List[str]:
     return requirements
 
 
+# Pure Python modules on the data loading hot path that can be compiled with mypyc.
+MYPYC_MODULES = [
+    "corenet/data/datasets/language_modeling/text_processing.py",
+]
+
+
+def get_ext_modules() -> List[Any]:
+    """Optionally compile pure Python modules with mypyc.
+
+    Compilation is enabled by setting 'CORENET_USE_MYPYC=1' in the environment. If mypyc is not
+    installed or fails to generate C code for the modules (e.g., because of type errors), a warning
+    is emitted and the pure Python modules are installed instead.
+
+    mypyc is not a build requirement, so pip's isolated build environment does not contain it. Install
+    mypyc in the current environment and disable build isolation to compile the modules:
+        pip install mypy && CORENET_USE_MYPYC=1 pip install --no-build-isolation --editable .
+
+    ...note:
+        mypyc only generates C code here. The C code is compiled later by 'build_ext', and a failure
+        at that stage (e.g., a missing C compiler) aborts the installation. In such a case, install
+        without 'CORENET_USE_MYPYC=1'.
+    """
+    if os.environ.get("CORENET_USE_MYPYC", "0") != "1":
+        return []
+
+    try:
+        from mypyc.build import mypycify
+    except ImportError:
+        warnings.warn(
+            f"CORENET_USE_MYPYC=1 is set, but mypyc is not installed. {MYPYC_MODULES} will not be compiled. "
+            "Note that pip builds in an isolated environment without mypyc, unless '--no-build-isolation' is passed."
+        )
+        return []
+
+    try:
+        # The modules only depend on the standard library, so imports of other corenet modules
+        # (e.g., parent packages) are not type-checked.
+        return mypycify(["--follow-imports=skip"] + MYPYC_MODULES, opt_level="3")
+    except SystemExit:
+        # mypyc reports the errors (printed above) and exits when it can't generate C code.
+        warnings.warn(
+            f"mypyc failed to generate C code for {MYPYC_MODULES}. See the errors above. "
+            "The pure Python modules will be installed."
+        )
+        return []
+
+
 def main() -> None:
     if sys.version_info < (3, 6):
         sys.exit("Sorry, Python >= 3.6 is required for CoreNet.")
@@ -109,6 +157,7 @@ def main() -> None:
             ("corenet-projects", get_files("projects")),
         ]
         + ([("corenet-internal", get_files("internal"))] if is_internal else []),
+        ext_modules=get_ext_modules(),
         test_suite="tests",
         entry_points={
             "console_scripts": console_scripts,
@@ -0,0 +1,242 @@
+#
+# For licensing see accompanying LICENSE file.
+# Copyright (C) 2024 Apple Inc. All Rights Reserved.
+#
+
+from typing import Dict, List, Optional
+
+import pytest
+import torch
+from torch import Tensor
+
+from tests.configs import get_config
+from tests.data.datasets.language_modeling.mock_general_lm import (
+    MockImgGeneralLMDataset,
+)
+from tests.data.datasets.language_modeling.test_text_processing import (
+    _reference_process_text,
+)
+
+TEXTS = [
+    "Hello world, CoreNet serves as a versatile research library.",
+    "   !",
+    "It has been used for small- and large-scale training.",
+    "a",
+    "Numerous research papers leverage its functionalities.",
+    # 'İ' lowercases to two characters, so the processed text has 6 characters.
+    "İİİ",
+]
+
+
+def _build_dataset(**overrides) -> MockImgGeneralLMDataset:
+    config_file = "tests/data/datasets/language_modeling/dummy_lm_dataset.yaml"
+    opts = get_config(config_file=config_file)
+    setattr(opts, "dataset.language_modeling.sequence_length", 12)
+    for key, value in overrides.items():
+        setattr(opts, f"dataset.language_modeling.{key}", value)
+    return MockImgGeneralLMDataset(opts)
+
+
+def _reference_tokenize_text(
+    dataset: MockImgGeneralLMDataset, text: str
+) -> Optional[Dict[str, Tensor]]:
+    """Reference implementation of '_tokenize_text', which tokenizes, filters and pads one text at a time."""
+    if len(_reference_process_text(text)) < dataset.min_characters_per_text:
+        return None
+
+    tokenized_text = dataset.tokenizer(text)
+    if tokenized_text.shape[0] < dataset.min_tokens_per_text:
+        return None
+
+    content = torch.full(
+        size=(dataset.sequence_length + 1,), fill_value=dataset.pad_token_id
+    )
+    num_tokens = min(tokenized_text.shape[0], dataset.sequence_length + 1)
+    content[:num_tokens] = tokenized_text[:num_tokens]
+    content = content.to(dtype=dataset._token_dtype)
+    return {"samples": content[:-1], "targets": content[1:]}
+
+
+@pytest.mark.parametrize(
+    "min_characters_per_text,min_tokens_per_text,expected_num_valid",
+    [(0, 0, 6), (5, 0, 4), (6, 0, 4), (7, 0, 3), (0, 15, 2), (5, 15, 2)],
+)
+def test_tokenize_batch(
+    min_characters_per_text: int, min_tokens_per_text: int, expected_num_valid: int
+) -> None:
+    """Test that batched tokenization matches tokenizing, filtering and padding texts one at a time."""
+    dataset = _build_dataset(
+        min_characters_per_text=min_characters_per_text,
+        min_tokens_per_text=min_tokens_per_text,
+    )
+
+    batch_outputs = dataset._tokenize_batch(TEXTS)
+    assert len(batch_outputs) == len(TEXTS)
+    for text, batch_output in zip(TEXTS, batch_outputs):
+        expected_output = _reference_tokenize_text(dataset, text)
+        if expected_output is None:
+            assert batch_output is None
+        else:
+            torch.testing.assert_close(batch_output, expected_output)
+
+    assert (batch_outputs[1] is None) == (
+        min_characters_per_text > 0 or min_tokens_per_text > 0
+    )
+    assert sum(output is not None for output in batch_outputs) == expected_num_valid
+    # CLIP's vocabulary fits in 32-bit integers.
+    assert batch_outputs[0]["samples"].dtype == torch.int32
+
+
+@pytest.mark.parametrize("tokenizer_batch_size", [1, 2, 64])
+def test_tokenize_texts(tokenizer_batch_size: int) -> None:
+    """Test that streamed tokenization skips invalid texts and preserves their order."""
+    dataset = _build_dataset(
+        min_characters_per_text=5, tokenizer_batch_size=tokenizer_batch_size
+    )
+
+    outputs = list(dataset._tokenize_texts(iter(TEXTS)))
+    expected_outputs = [
+        output
+        for output in (_reference_tokenize_text(dataset, text) for text in TEXTS)
+        if output is not None
+    ]
+    assert len(outputs) == 4
+    torch.testing.assert_close(outputs, expected_outputs)
+
+
+def test_tokenize_batch_outputs_share_one_tensor() -> None:
+    """Test that the samples of a batch are views of one tensor, and targets are the samples shifted by one."""
+    dataset = _build_dataset()
+
+    outputs = [
+        output for output in dataset._tokenize_batch(TEXTS) if output is not None
+    ]
+    assert len(outputs) > 1
+    storage_ptr = outputs[0]["samples"].untyped_storage().data_ptr()
+    for output in outputs:
+        samples, targets = output["samples"], output["targets"]
+        assert samples.untyped_storage().data_ptr() == storage_ptr
+        assert targets.untyped_storage().data_ptr() == storage_ptr
+        assert targets.data_ptr() == samples.data_ptr() + samples.element_size()
+
+
+@pytest.mark.parametrize("tokenizer_batch_size", [1, 2, 64])
+def test_tokenize_texts_with_packing(tokenizer_batch_size: int) -> None:
+    """Test that packed sequences contain the tokens of all valid texts without padding."""
+    dataset = _build_dataset(
+        min_characters_per_text=5,
+        tokenizer_batch_size=tokenizer_batch_size,
+        pack_sequences=True,
+    )
+    sequence_length = dataset.sequence_length
+
+    outputs = list(dataset._tokenize_texts(iter(TEXTS)))
+
+    # CLIP's tokenizer appends the end of text token, so no separator is added.
+    expected_tokens = torch.cat(
+        [
+            dataset.tokenizer(text)
+            for text in TEXTS
+            if _reference_tokenize_text(dataset, text) is not None
+        ]
+    ).to(dtype=dataset._token_dtype)
+    num_sequences = expected_tokens.shape[0] // (sequence_length + 1)
+    assert len(outputs) == num_sequences
+    for sequence_id, output in enumerate(outputs):
+        start = sequence_id * (sequence_length + 1)
+        expected_content = expected_tokens[start : start + sequence_length + 1]
+        torch.testing.assert_close(output["samples"], expected_content[:-1])
+        torch.testing.assert_close(output["targets"], expected_content[1:])
+    torch.testing.assert_close(
+        dataset._packing_carry, expected_tokens[num_sequences * (sequence_length + 1) :]
+    )
+
+
+@pytest.mark.parametrize("sequence_length", [5, 16, 30])
+def test_tokenize_text_padding_and_truncation(sequence_length: int) -> None:
+    """Test that tokenized texts are truncated or padded to the sequence length."""
+    dataset = _build_dataset(sequence_length=sequence_length)
+    text = TEXTS[0]
+
+    output = dataset._tokenize_text(text)
+
+    tokenized_text = dataset.tokenizer(text)[: sequence_length + 1]
+    num_pad_tokens = sequence_length + 1 - tokenized_text.shape[0]
+    expected_content = torch.cat(
+        [tokenized_text, torch.full((max(num_pad_tokens, 0),), dataset.pad_token_id)]
+    ).to(dtype=dataset._token_dtype)
+    torch.testing.assert_close(output["samples"], expected_content[:-1])
+    torch.testing.assert_close(output["targets"], expected_content[1:])
+
+
+@pytest.mark.parametrize(
+    "sliding_window_stride,expected_starts",
+    [(2, [0, 2, 4]), (4, [0, 4]), (12, [0, 12]), (16, [0])],
+)
+def test_tokenize_texts_with_sliding_window(
+    sliding_window_stride: int, expected_starts: List[int]
+) -> None:
+    """Test that long texts are split into multiple samples with a sliding window."""
+    dataset = _build_dataset(sliding_window_stride=sliding_window_stride)
+    sequence_length = dataset.sequence_length
+    text = TEXTS[0]
+    tokenized_text = dataset.tokenizer(text)
+    assert tokenized_text.shape[0] == 17
+
+    outputs = list(dataset._tokenize_texts(iter([text])))
+
+    assert len(outputs) == len(expected_starts)
+    for start, output in zip(expected_starts, outputs):
+        expected_content = tokenized_text[start : start + sequence_length + 1]
+        num_pad_tokens = sequence_length + 1 - expected_content.shape[0]
+        expected_content = torch.cat(
+            [expected_content, torch.full((num_pad_tokens,), dataset.pad_token_id)]
+        ).to(dtype=dataset._token_dtype)
+        torch.testing.assert_close(output["samples"], expected_content[:-1])
+        torch.testing.assert_close(output["targets"], expected_content[1:])
+
+    # Short texts yield a single sample, as without the sliding window.
+    torch.testing.assert_close(
+        list(dataset._tokenize_texts(iter(TEXTS[1:2]))),
+        [_reference_tokenize_text(dataset, TEXTS[1])],
+    )
+
+
+def test_tokenize_batch_keeps_lengthened_non_ascii_texts() -> None:
+    """Test that texts whose processed version is longer than the input are not pre-filtered."""
+    dataset = _build_dataset(min_characters_per_text=6)
+
+    # 'İİİ' is processed into 6 characters because 'İ' lowercases to two characters.
+    outputs = dataset._tokenize_batch(["İİİ", "abc"])
+    assert outputs[0] is not None
+    assert outputs[1] is None
+
+
+@pytest.mark.parametrize("sequence_length", [2, 5, 16, 30])
+def test_make_samples(sequence_length: int) -> None:
+    """Test that batched samples match truncating or padding each tokenized text."""
+    dataset = _build_dataset(sequence_length=sequence_length)
+    tokenized_texts = [dataset.tokenizer(text) for text in TEXTS]
+    # With a sequence length of 2, all texts are long enough and no padding is needed.
+    assert (sequence_length == 2) == all(
+        tokenized_text.shape[0] > sequence_length for tokenized_text in tokenized_texts
+    )
+
+    outputs = list(dataset._make_samples(tokenized_texts))
+
+    assert len(outputs) == len(TEXTS)
+    for tokenized_text, output in zip(tokenized_texts, outputs):
+        expected_content = tokenized_text[: sequence_length + 1]
+        num_pad_tokens = sequence_length + 1 - expected_content.shape[0]
+        expected_content = torch.cat(
+            [expected_content, torch.full((num_pad_tokens,), dataset.pad_token_id)]
+        ).to(dtype=dataset._token_dtype)
+        torch.testing.assert_close(output["samples"], expected_content[:-1])
+        torch.testing.assert_close(output["targets"], expected_content[1:])
+
+
+@pytest.mark.parametrize("tokenizer_batch_size", [0, -1])
+def test_non_positive_tokenizer_batch_size(tokenizer_batch_size: int) -> None:
+    """Test that non-positive tokenizer batch sizes are rejected."""
+    with pytest.raises(SystemExit):
+        _build_dataset(tokenizer_batch_size=tokenizer_batch_size)
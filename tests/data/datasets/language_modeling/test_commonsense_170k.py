@@ -6,6 +6,7 @@
 import json
 import tempfile
 
+import torch
 import yaml
 
 from corenet.data.datasets.language_modeling import commonsense_170k
@@ -49,3 +50,23 @@ def test_general_lm_dataset() -> None:
             max_iterations=max_iterations,
             expected_sequence_length=sequence_length,
         )
+
+
+def test_commonsense_170k_order_is_reproducible() -> None:
+    """Test that CommonSense170k yields the samples in the same order for a given seed."""
+    with tempfile.NamedTemporaryFile() as tmp:
+        write_data(tmp.name)
+        config_file = (
+            "tests/data/datasets/language_modeling/dummy_commonsense_170k.yaml"
+        )
+        opts = get_config(config_file=config_file)
+        setattr(opts, "dataset.language_modeling.sequence_length", 5)
+        setattr(opts, "dataset.language_modeling.commonsense_170k.path", tmp.name)
+
+        def get_samples():
+            dataset = commonsense_170k.CommonSense170k(opts)
+            return list(dataset.generate_sample(scaled_rank=0, scaled_world_size=1))
+
+        samples = get_samples()
+        assert len(samples) == 5
+        torch.testing.assert_close(samples, get_samples())
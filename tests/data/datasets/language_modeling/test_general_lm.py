@@ -3,6 +3,10 @@
 # Copyright (C) 2024 Apple Inc. All Rights Reserved.
 #
 
+import os
+import pickle
+from typing import List, Optional, Tuple
+
 import pytest
 import torch
 
@@ -74,3 +78,138 @@ def test_general_lm_dataset(max_iterations: int) -> None:
     _iterate_and_test_dataset(
         dataset, max_iterations=max_iterations, expected_sequence_length=sequence_length
     )
+
+
+@pytest.mark.parametrize("pack_sequences", [False, True])
+def test_general_lm_dataset_tokenizer_cache(tmp_path, pack_sequences: bool) -> None:
+    """Test that samples read from the tokenizer cache match the samples read from the file."""
+    config_file = "tests/data/datasets/language_modeling/dummy_lm_dataset.yaml"
+    opts = get_config(config_file=config_file)
+    setattr(opts, "dataset.language_modeling.sequence_length", 12)
+    setattr(opts, "dataset.language_modeling.pack_sequences", pack_sequences)
+    setattr(
+        opts, "dataset.language_modeling.general_lm.tokenizer_cache_dir", str(tmp_path)
+    )
+
+    dataset = MockImgGeneralLMDataset(opts)
+    dataset._reset_data_state()
+    file_path = next(
+        path for path in dataset.data_info["file_paths"] if path.endswith("jsonl")
+    )
+    cache_path = dataset._get_tokenizer_cache_path(file_path)
+    assert not os.path.isfile(f"{cache_path}.index")
+
+    reader = dataset._get_file_reader(file_path=file_path)
+    expected_samples = list(reader(file_path=file_path, text_key="text"))
+    assert os.path.isfile(f"{cache_path}.index")
+
+    if pack_sequences:
+        dataset._packing_carry = dataset._packing_carry[:0]
+    cached_samples = list(dataset._read_data_from_tokenizer_cache(cache_path))
+    assert len(cached_samples) == len(expected_samples) > 0
+    torch.testing.assert_close(cached_samples, expected_samples)
+
+    # Replacing the tokenizer model file at the same path changes the cache.
+    (model_file_path,) = dataset.tokenizer.model_file_paths
+    model_file_stat = os.stat(model_file_path)
+    try:
+        os.utime(
+            model_file_path,
+            ns=(model_file_stat.st_atime_ns, model_file_stat.st_mtime_ns + 10**9),
+        )
+        assert dataset._get_tokenizer_cache_path(file_path) != cache_path
+    finally:
+        os.utime(
+            model_file_path,
+            ns=(model_file_stat.st_atime_ns, model_file_stat.st_mtime_ns),
+        )
+
+    # The mock dataset rewrites its data files when it is built, so the options are changed on the
+    # same dataset instead of building a new one.
+    # Options that do not affect the tokens keep the cache.
+    setattr(dataset.opts, "text_tokenizer.sentence_piece.num_threads", 4)
+    assert dataset._get_tokenizer_cache_path(file_path) == cache_path
+    # Changing the filtering options changes the cache.
+    dataset.min_tokens_per_text = 1
+    assert dataset._get_tokenizer_cache_path(file_path) != cache_path
+    dataset.min_tokens_per_text = 0
+    # Changing options that affect tokenization changes the cache.
+    setattr(dataset.opts, "text_tokenizer.openai_clip.bpe_path", "another_bpe_path")
+    assert dataset._get_tokenizer_cache_path(file_path) != cache_path
+
+
+def test_general_lm_dataset_skips_chunks_before_reading_documents() -> None:
+    """Test that chunks skipped when resuming are not converted into documents."""
+    config_file = "tests/data/datasets/language_modeling/dummy_lm_dataset.yaml"
+    opts = get_config(config_file=config_file)
+    dataset = MockImgGeneralLMDataset(opts)
+    dataset._reset_data_state()
+    dataset._target_state["chunk"] = 2
+
+    converted_chunks = []
+
+    def get_documents(chunk_id: int) -> List[str]:
+        converted_chunks.append(chunk_id)
+        return ["Hello world, CoreNet serves as a versatile research library."]
+
+    file_path = dataset.data_info["file_paths"][0]
+    samples = list(
+        dataset._tokenize_document_chunks(
+            range(4), get_documents=get_documents, file_path=file_path
+        )
+    )
+    assert converted_chunks == [2, 3]
+    assert len(samples) == 2
+
+
+def test_general_lm_dataset_shuffle_fn() -> None:
+    """Test that files are shuffled and selected reproducibly for a given seed."""
+    config_file = "tests/data/datasets/language_modeling/dummy_lm_dataset.yaml"
+    opts = get_config(config_file=config_file)
+    file_names = [f"file_{idx}.jsonl" for idx in range(8)]
+    text_keys = [f"text_{idx}" for idx in range(8)]
+
+    def shuffle(k: Optional[int] = None) -> Tuple[List[str], List[str]]:
+        dataset = MockImgGeneralLMDataset(opts)
+        dataset.is_training = True
+        return dataset._shuffle_fn(file_names=file_names, text_keys=text_keys, k=k)
+
+    shuffled_file_names, shuffled_text_keys = shuffle()
+    assert (shuffled_file_names, shuffled_text_keys) == shuffle()
+    assert sorted(shuffled_file_names) == file_names
+    # File names and text keys are shuffled together.
+    text_key_of_file = dict(zip(file_names, text_keys))
+    assert [
+        text_key_of_file[name] for name in shuffled_file_names
+    ] == shuffled_text_keys
+
+    setattr(opts, "dataset.language_modeling.random_seed", 1)
+    assert shuffle()[0] != shuffled_file_names
+
+    # Files are selected with replacement, so more files than available can be selected.
+    setattr(opts, "dataset.language_modeling.random_seed", 0)
+    k = 20
+    selected_file_names, selected_text_keys = shuffle(k=k)
+    assert (selected_file_names, selected_text_keys) == shuffle(k=k)
+    assert len(selected_file_names) == len(selected_text_keys) == k
+    assert set(selected_file_names) <= set(file_names)
+    assert len(set(selected_file_names)) < k
+
+
+def test_general_lm_dataset_rejects_state_with_other_random_generator(
+    tmp_path,
+) -> None:
+    """Test that resuming from a data state shuffled with another random generator fails."""
+    config_file = "tests/data/datasets/language_modeling/dummy_lm_dataset.yaml"
+    opts = get_config(config_file=config_file)
+    dataset = MockImgGeneralLMDataset(opts)
+
+    # Data states saved with 'random.Random' did not store the random generator.
+    data_state_path = tmp_path / "data_state_0_0.pkl"
+    with open(data_state_path, "wb") as fh:
+        pickle.dump({"epoch": 1, "file": None, "chunk": 2, "_time": 0}, fh)
+    setattr(
+        opts, "dataset.language_modeling.general_lm.data_state", [str(data_state_path)]
+    )
+    with pytest.raises(SystemExit):
+        dataset._load_data_state()
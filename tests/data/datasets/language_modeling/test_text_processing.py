@@ -0,0 +1,80 @@
+#
+# For licensing see accompanying LICENSE file.
+# Copyright (C) 2024 Apple Inc. All Rights Reserved.
+#
+
+import re
+import string
+
+import pytest
+
+from corenet.data.datasets.language_modeling.text_processing import (
+    cleaned_length_ascii,
+    cleaned_length_at_least,
+)
+
+
+def _reference_process_text(text: str) -> str:
+    """Reference implementation of the SlimPajama text processing, independent of the optimized code paths."""
+    text = text.lower().translate(str.maketrans("", "", string.punctuation))
+    return re.sub(r"\s+", " ", text.strip())
+
+
+@pytest.mark.parametrize(
+    "text,expected_text",
+    [
+        ("Hello, World!", "hello world"),
+        ("  Multiple   spaces\tand\nnew lines.  ", "multiple spaces and new lines"),
+        ("a ! b", "a b"),
+        ("   !", ""),
+        ("", ""),
+        ("Ünïcödé TEXT—with dash", "ünïcödé text—with dash"),
+        ("MiXeD CaSe ASCII", "mixed case ascii"),
+        (
+            "separators\x1cand\x1fcontrol\x0bcharacters",
+            "separators and control characters",
+        ),
+    ],
+)
+def test_cleaned_length_matches_processed_text(text: str, expected_text: str) -> None:
+    assert _reference_process_text(text) == expected_text
+    assert cleaned_length_at_least(text, len(expected_text))
+    assert not cleaned_length_at_least(text, len(expected_text) + 1)
+
+
+@pytest.mark.parametrize("threshold", [0, 1, 3, 6, 7, 10, 1000])
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Hello, World!",
+        "  Multiple   spaces\tand\nnew lines.  ",
+        "a ! b",
+        "   !",
+        "",
+        "Ünïcödé TEXT—with dash",
+        # 'İ' lowercases to two characters.
+        "İİİ",
+        " İ, İ ",
+    ],
+)
+def test_cleaned_length_at_least(text: str, threshold: int) -> None:
+    assert cleaned_length_at_least(text, threshold) == (
+        len(_reference_process_text(text)) >= threshold
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Hello, World!",
+        "  Multiple   spaces\tand\nnew lines.  ",
+        "a ! b",
+        "   !",
+        "",
+        "separators\x1cand\x1fcontrol\x0bcharacters",
+    ],
+)
+def test_cleaned_length_ascii(text: str) -> None:
+    assert cleaned_length_ascii(text.encode("ascii")) == len(
+        _reference_process_text(text)
+    )
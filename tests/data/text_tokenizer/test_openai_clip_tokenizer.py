@@ -43,3 +43,25 @@ def test_openai_clip_tokenizer():
     assert tokenizer.eot_token == "<|endoftext|>"
     assert tokenizer.sot_token_id == 49406
     assert tokenizer.eot_token_id == 49407
+
+    batch_out = tokenizer.tok_encode_batch(
+        ["the quick brown fox jumped over the lazy dog", "the lazy dog"]
+    )
+    assert len(batch_out) == 2
+    torch.testing.assert_close(actual=batch_out[0], expected=expected_out)
+    torch.testing.assert_close(actual=batch_out[1], expected=tokenizer("the lazy dog"))
+
+    padded_out, num_tokens = tokenizer.tok_encode_batch_padded(
+        ["the quick brown fox jumped over the lazy dog", "the lazy dog"],
+        length=6,
+        padding_value=0,
+        dtype=torch.int32,
+    )
+    assert num_tokens == [11, 5]
+    assert padded_out.dtype == torch.int32
+    torch.testing.assert_close(
+        actual=padded_out,
+        expected=torch.stack(
+            [expected_out[:6], torch.cat([batch_out[1], torch.zeros(1).long()])]
+        ).int(),
+    )
@@ -0,0 +1,91 @@
+#
+# For licensing see accompanying LICENSE file.
+# Copyright (C) 2024 Apple Inc. All Rights Reserved.
+#
+
+import argparse
+from pathlib import Path
+from typing import List
+
+import pytest
+import torch
+
+from corenet.data.text_tokenizer.sentencepiece_tokenizer import SentencePieceTokenizer
+
+spm = pytest.importorskip("sentencepiece")
+
+SENTENCES = [
+    "the quick brown fox jumped over the lazy dog",
+    "the lazy dog",
+    "",
+    "CoreNet serves as a versatile research library.",
+]
+
+
+def _train_sentence_piece_model(tmp_path: Path) -> str:
+    """Train a tiny sentence piece model and return its path."""
+    corpus = [
+        "the quick brown fox jumped over the lazy dog",
+        "CoreNet serves as a versatile research library catering to a wide array of purposes.",
+        "It has been used for small- and large-scale training.",
+    ] * 10
+    model_prefix = str(tmp_path / "spm")
+    spm.SentencePieceTrainer.train(
+        sentence_iterator=iter(corpus),
+        model_prefix=model_prefix,
+        vocab_size=64,
+        model_type="bpe",
+        minloglevel=2,
+    )
+    return f"{model_prefix}.model"
+
+
+def _reference_tok_encode(
+    tokenizer: SentencePieceTokenizer, sp_model: "spm.SentencePieceProcessor", text: str
+) -> List[int]:
+    """Reference implementation that adds the special tokens around a single 'Encode' call."""
+    return [tokenizer.sot_token_id] + sp_model.Encode(text) + [tokenizer.eot_token_id]
+
+
+@pytest.mark.parametrize("num_threads", [1, -1])
+def test_sentence_piece_tokenizer(tmp_path: Path, num_threads: int) -> None:
+    """Test that single, batched and padded encoding match encoding one sentence at a time."""
+    model_path = _train_sentence_piece_model(tmp_path)
+    opts = argparse.Namespace()
+    setattr(opts, "text_tokenizer.sentence_piece.model_path", model_path)
+    setattr(opts, "text_tokenizer.sentence_piece.enable_nfc_normalization", False)
+    setattr(opts, "text_tokenizer.sentence_piece.append_sot_token", True)
+    setattr(opts, "text_tokenizer.sentence_piece.append_eot_token", True)
+    setattr(opts, "text_tokenizer.sentence_piece.num_threads", num_threads)
+    tokenizer = SentencePieceTokenizer(opts)
+    assert tokenizer.model_file_paths == [model_path]
+
+    sp_model = spm.SentencePieceProcessor(model_file=model_path)
+    expected_token_ids = [
+        _reference_tok_encode(tokenizer, sp_model, sentence) for sentence in SENTENCES
+    ]
+
+    for sentence, token_ids in zip(SENTENCES, expected_token_ids):
+        torch.testing.assert_close(
+            tokenizer.tok_encode(sentence), torch.tensor(token_ids, dtype=torch.long)
+        )
+
+    batch_out = tokenizer.tok_encode_batch(SENTENCES)
+    assert len(batch_out) == len(SENTENCES)
+    for out, token_ids in zip(batch_out, expected_token_ids):
+        torch.testing.assert_close(out, torch.tensor(token_ids, dtype=torch.long))
+
+    length = 6
+    padding_value = tokenizer.pad_token_id
+    padded_out, num_tokens = tokenizer.tok_encode_batch_padded(
+        SENTENCES, length=length, padding_value=padding_value, dtype=torch.int32
+    )
+    assert num_tokens == [len(token_ids) for token_ids in expected_token_ids]
+    expected_padded_out = torch.tensor(
+        [
+            token_ids[:length] + [padding_value] * (length - len(token_ids))
+            for token_ids in expected_token_ids
+        ],
+        dtype=torch.int32,
+    )
+    torch.testing.assert_close(padded_out, expected_padded_out)
@@ -19,8 +19,13 @@ from corenet.loss_fn.language_modeling.cross_entropy import CrossEntropyLM
         (0.1, 2, 5, True),
     ],
 )
+@pytest.mark.parametrize("target_dtype", [torch.long, torch.int32])
 def test_cross_entropy_lm_in_out(
-    label_smoothing: float, ignore_index: int, vocab_size: int, z_loss: bool
+    label_smoothing: float,
+    ignore_index: int,
+    vocab_size: int,
+    z_loss: bool,
+    target_dtype: torch.dtype,
 ) -> None:
     """Test for CrossEntropyLM loss function.
 
@@ -57,6 +62,7 @@ def test_cross_entropy_lm_in_out(
             batch_size,
             seq_length,
         ),
+        dtype=target_dtype,
     )
     # randomly set indices in target tensor to ignore_index
     random_indices = (torch.rand_like(target.float()) > 0.5) * 1.0